@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Компактные контейнеры снимков системы для SystemMonitor
+Слоты вместо словаря на каждую запись; в JSON сохраняется прежний формат
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+@dataclass(slots=True)
+class CpuSample:
+    percent: float = 0
+    per_core: list = field(default_factory=list)
+    freq_current: float | None = None
+    freq_min: float | None = None
+    freq_max: float | None = None
+    load_avg: tuple | None = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            percent=data.get('cpu_percent', 0),
+            per_core=data.get('cpu_per_core', []),
+            freq_current=data.get('cpu_freq_current'),
+            freq_min=data.get('cpu_freq_min'),
+            freq_max=data.get('cpu_freq_max'),
+            load_avg=data.get('load_avg')
+        )
+
+    def to_dict(self):
+        return {
+            'cpu_percent': self.percent,
+            'cpu_per_core': self.per_core,
+            'cpu_freq_current': self.freq_current,
+            'cpu_freq_min': self.freq_min,
+            'cpu_freq_max': self.freq_max,
+            'load_avg': self.load_avg
+        }
+
+
+@dataclass(slots=True)
+class MemSample:
+    total: int = 0
+    available: int = 0
+    used: int = 0
+    free: int = 0
+    percent: float = 0
+    swap_total: int = 0
+    swap_used: int = 0
+    swap_free: int = 0
+    swap_percent: float = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            total=data.get('memory_total', 0),
+            available=data.get('memory_available', 0),
+            used=data.get('memory_used', 0),
+            free=data.get('memory_free', 0),
+            percent=data.get('memory_percent', 0),
+            swap_total=data.get('swap_total', 0),
+            swap_used=data.get('swap_used', 0),
+            swap_free=data.get('swap_free', 0),
+            swap_percent=data.get('swap_percent', 0)
+        )
+
+    def to_dict(self):
+        return {
+            'memory_total': self.total,
+            'memory_available': self.available,
+            'memory_used': self.used,
+            'memory_free': self.free,
+            'memory_percent': self.percent,
+            'swap_total': self.swap_total,
+            'swap_used': self.swap_used,
+            'swap_free': self.swap_free,
+            'swap_percent': self.swap_percent
+        }
+
+
+@dataclass(slots=True)
+class DiskSample:
+    device: str
+    mountpoint: str
+    file_system: str
+    total: int
+    used: int
+    free: int
+    percent: float
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            device=data['device'],
+            mountpoint=data['mountpoint'],
+            file_system=data['file_system'],
+            total=data['total'],
+            used=data['used'],
+            free=data['free'],
+            percent=data['percent']
+        )
+
+    def to_dict(self):
+        return {
+            'device': self.device,
+            'mountpoint': self.mountpoint,
+            'file_system': self.file_system,
+            'total': self.total,
+            'used': self.used,
+            'free': self.free,
+            'percent': self.percent
+        }
+
+
+@dataclass(slots=True)
+class Snapshot:
+    timestamp: str
+    ts_epoch: float
+    cpu: CpuSample
+    memory: MemSample
+    disks: list = field(default_factory=list)
+    disk_io: dict | None = None
+    network: dict = field(default_factory=dict)
+    processes: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Создает снимок из словаря (результат get_*_info или запись из лога)"""
+        disk = data.get('disk', {})
+        ts_epoch = data.get('ts_epoch')
+        if ts_epoch is None:
+            # Старые записи без ts_epoch: разбираем строку времени один раз
+            ts_epoch = datetime.fromisoformat(data['timestamp']).timestamp()
+        return cls(
+            timestamp=data['timestamp'],
+            ts_epoch=ts_epoch,
+            cpu=CpuSample.from_dict(data.get('cpu', {})),
+            memory=MemSample.from_dict(data.get('memory', {})),
+            disks=[DiskSample.from_dict(d) for d in disk.get('disks', [])],
+            disk_io=disk.get('disk_io'),
+            network=data.get('network', {}),
+            processes=data.get('processes', {})
+        )
+
+    def to_dict(self):
+        """Словарь в формате лога"""
+        return {
+            'timestamp': self.timestamp,
+            'ts_epoch': self.ts_epoch,
+            'cpu': self.cpu.to_dict(),
+            'memory': self.memory.to_dict(),
+            'disk': {
+                'disks': [d.to_dict() for d in self.disks],
+                'disk_io': self.disk_io
+            },
+            'network': self.network,
+            'processes': self.processes
+        }
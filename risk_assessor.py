@@ -1,31 +1,133 @@
 import random
 import statistics
 
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _welford_mean_std(a):
+    # Один проход по Уэлфорду: среднее и выборочное стд. отклонение (ddof=1)
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for datum in a:
+        count += 1
+        delta = datum - mean
+        mean += delta / count
+        m2 += (datum - mean) * delta
+    return mean, (m2 / (count - 1)) ** 0.5
+
+
+if numba is not None:
+    _mean_std_kernel = numba.njit(cache=True)(_welford_mean_std)
+else:
+    # Без numba цикл на Python медленнее, чем редукции NumPy
+    def _mean_std_kernel(a):
+        return a.mean(), a.std(ddof=1)
+
+
+def _mean_std(a):
+    # Обе реализации одинаково отказываются от выборок короче двух значений, как statistics.stdev
+    if a.size < 2:
+        raise statistics.StatisticsError("stdev requires at least two data points")
+    mean, std = _mean_std_kernel(a)
+    return float(mean), float(std)
+
 class RiskAssessor:
     """
     Анализ финансовых рисков на основе исторических доходностей.
-    Поддержка Value-at-Risk (VaR), стресс-тесты, сценарный анализ.
+    Поддержка Value-at-Risk (VaR), CVaR, Λ-квантиля, стресс-тесты, сценарный анализ.
     """
     def __init__(self, returns):
         self.returns = returns
 
+    @property
+    def returns(self):
+        return self._returns
+
+    @returns.setter
+    def returns(self, returns):
+        # Новые данные сбрасывают кэш отсортированного массива
+        self._returns = returns
+        self._arr = np.asarray(returns, dtype=np.float64)
+        self._sorted = None
+
+    def _ensure_sorted(self):
+        """Отсортированные доходности; сортировка выполняется один раз и кэшируется."""
+        if self._sorted is None:
+            self._sorted = np.sort(self._arr)
+        return self._sorted
+
     def value_at_risk(self, confidence=0.95):
-        sorted_returns = sorted(self.returns)
-        var_index = int((1-confidence) * len(sorted_returns))
-        var = abs(sorted_returns[var_index])
-        print(f"VaR ({confidence*100:.0f}%) = {var:.2f}")
-        return var
+        return self.value_at_risk_multi([confidence])[confidence]
+
+    def value_at_risk_multi(self, confidences):
+        """VaR сразу для нескольких уровней доверия без повторной сортировки."""
+        # Массив NumPy или генератор: приводим к списку, генератор иначе исчерпается до zip
+        confidences = list(confidences)
+        if not confidences:
+            return {}
+        var_indices = [int((1-c) * self._arr.size) for c in confidences]
+        if self._sorted is not None or len(confidences) > 1:
+            # Несколько уровней или повторные запросы: сортируем один раз и кэшируем
+            part = self._ensure_sorted()
+        else:
+            # Разовый VaR: частичной сортировки (quickselect) достаточно
+            part = np.partition(self._arr, var_indices)
+        result = {}
+        for confidence, var_index in zip(confidences, var_indices):
+            var = float(abs(part[var_index]))
+            print(f"VaR ({confidence*100:.0f}%) = {var:.2f}")
+            result[confidence] = var
+        return result
+
+    def cvar(self, confidence=0.95):
+        """Conditional VaR: средний убыток в хвосте за порогом VaR."""
+        if not self._arr.size:
+            raise statistics.StatisticsError("cvar requires at least one data point")
+        var_index = int((1-confidence) * self._arr.size)
+        # Худшие доходности - начало отсортированного массива из кэша
+        cvar = float(abs(self._ensure_sorted()[:var_index + 1].mean()))
+        print(f"CVaR ({confidence*100:.0f}%) = {cvar:.2f}")
+        return cvar
+
+    def lambda_quantile(self, lam):
+        """
+        Эмпирический Λ-квантиль: наименьшая доходность x, для которой F(x) > Λ(x).
+        lam — функция Λ(x) со значениями в [0, 1] либо константа.
+        """
+        s = self._ensure_sorted()
+        n = s.size
+        cdf = np.arange(1, n + 1) / n
+        thresholds = np.vectorize(lam, otypes=[np.float64])(s) if callable(lam) else lam
+        hit = cdf > thresholds
+        if not hit.any():
+            # Условие не выполняется ни в одной точке: инфимум пустого множества
+            q = float("inf")
+            print(f"Λ-квантиль = {q:.2f}")
+            return q
+        q = float(s[np.argmax(hit)])
+        print(f"Λ-квантиль = {q:.2f}")
+        return q
 
     def stress_test(self, stress_scenario):
-        stressed = [x + stress_scenario for x in self.returns]
-        avg = statistics.mean(stressed)
+        if not self._arr.size:
+            raise statistics.StatisticsError("mean requires at least one data point")
+        # mean(x + c) == mean(x) + c: одна редукция без промежуточного массива
+        avg = float(self._arr.mean() + stress_scenario)
         print(f"Среднее значение при шоковом сценарии: {avg:.2f}")
         return avg
 
     def plot_distribution(self):
         try:
             import matplotlib.pyplot as plt
-            plt.hist(self.returns, bins=20, color="blue", alpha=0.7)
+            # Гистограмму считает NumPy, matplotlib только рисует столбцы
+            counts, edges = np.histogram(self._arr, bins=20)
+            plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="blue", alpha=0.7)
             plt.title("Распределение доходностей")
             plt.xlabel("Доходность, %")
             plt.show()
@@ -33,7 +135,8 @@ class RiskAssessor:
             print("Для графиков установите matplotlib")
 
     def report(self):
-        print(f"Средняя доходность: {statistics.mean(self.returns):.2f}, Стд: {statistics.stdev(self.returns):.2f}")
+        mean, std = _mean_std(self._arr)
+        print(f"Средняя доходность: {mean:.2f}, Стд: {std:.2f}")
 
 if __name__ == "__main__":
     ret = [random.gauss(1.5, 8) for _ in range(100)]
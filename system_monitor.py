@@ -9,17 +9,136 @@ import psutil
 import time
 import json
 import os
-from datetime import datetime, timedelta
+import heapq
+from datetime import datetime
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import platform
 
+import numpy as np
+
+from _schema import Snapshot
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj):
+    """Сериализует объект в строку JSON (bytes, UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data):
+    """Разбирает строку JSON (bytes или str)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _aggregate(values):
+    """Среднее, максимум и минимум массива (нули, если массив пуст)"""
+    if not values.size:
+        return {'avg': 0, 'max': 0, 'min': 0}
+    return {
+        'avg': float(values.mean()),
+        'max': float(values.max()),
+        'min': float(values.min())
+    }
+
+def _make_alert(timestamp, alert_type, message, value, threshold):
+    """Создает запись уведомления о превышении порога"""
+    return {
+        'timestamp': timestamp,
+        'type': alert_type,
+        'message': message,
+        'value': value,
+        'threshold': threshold
+    }
+
+class _RollingMetric:
+    """Скользящие среднее/максимум/минимум с обновлением за амортизированное O(1)"""
+    
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+        self._max = deque()  # (seq, value), значения по убыванию
+        self._min = deque()  # (seq, value), значения по возрастанию
+    
+    def push(self, seq, value):
+        # Нулевые замеры считаются отсутствующими, как и в полном пересчете
+        if not value:
+            return
+        self.total += value
+        self.count += 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+    
+    def evict(self, seq, value):
+        if not value:
+            return
+        self.total -= value
+        self.count -= 1
+        if self._max and self._max[0][0] == seq:
+            self._max.popleft()
+        if self._min and self._min[0][0] == seq:
+            self._min.popleft()
+    
+    def stats(self):
+        if not self.count:
+            return {'avg': 0, 'max': 0, 'min': 0}
+        return {
+            'avg': self.total / self.count,
+            'max': self._max[0][1],
+            'min': self._min[0][1]
+        }
+
+
+class _RollingWindow:
+    """Статистика CPU и памяти за последние seconds секунд (не более maxlen замеров)"""
+    
+    def __init__(self, seconds, maxlen):
+        self.seconds = seconds
+        self.maxlen = maxlen
+        self._samples = deque()  # (seq, ts, cpu, mem)
+        self.cpu = _RollingMetric()
+        self.memory = _RollingMetric()
+    
+    def push(self, seq, ts, cpu, mem):
+        self._samples.append((seq, ts, cpu, mem))
+        self.cpu.push(seq, cpu)
+        self.memory.push(seq, mem)
+        if len(self._samples) > self.maxlen:
+            self._pop()
+    
+    def expire(self, now):
+        cutoff = now - self.seconds
+        while self._samples and self._samples[0][1] < cutoff:
+            self._pop()
+    
+    def _pop(self):
+        seq, _, cpu, mem = self._samples.popleft()
+        self.cpu.evict(seq, cpu)
+        self.memory.evict(seq, mem)
+    
+    def __len__(self):
+        return len(self._samples)
+
+
 class SystemMonitor:
-    def __init__(self, log_file="system_monitor.json"):
+    def __init__(self, log_file="system_monitor.jsonl"):
         self.log_file = log_file
         self.monitoring = False
         self.log_data = deque(maxlen=1000)  # Храним последние 1000 записей
-        self.alerts = []
+        self.alerts = deque(maxlen=100)  # Храним последние 100 уведомлений
         
         # Пороговые значения для уведомлений
         self.thresholds = {
@@ -29,24 +148,93 @@ class SystemMonitor:
             'network_speed': 100  # MB/s
         }
         
+        # Список разделов почти не меняется - обновляем его раз в 5 минут
+        self.partitions_refresh_interval = 300  # сек
+        self._partitions = None
+        self._partitions_time = 0.0
+        
+        # Сборщики независимы и большую часть времени ждут системных вызовов - запускаем их параллельно
+        self._pool = ThreadPoolExecutor(max_workers=5, thread_name_prefix='collector')
+        
+        # Параллельные кольцевые буферы (время, CPU, память) для векторных запросов статистики
+        size = self.log_data.maxlen
+        self._ts = np.zeros(size)
+        self._cpu = np.zeros(size)
+        self._mem = np.zeros(size)
+        self._i = 0  # позиция следующей записи
+        self._n = 0  # количество заполненных ячеек
+        
+        # Инкрементальная статистика для типовых периодов (в часах); остальные - сканированием буферов
+        # Буферы и окна обновляются потоком мониторинга и читаются из интерфейса
+        self._stats_lock = threading.Lock()
+        self._seq = 0
+        self._windows = {
+            hours: _RollingWindow(hours * 3600, size) for hours in (1, 6, 24)
+        }
+        
         self.load_log_data()
     
     def load_log_data(self):
-        """Загружает данные логов из файла"""
+        """Загружает данные логов из файла (JSON Lines)"""
         try:
             if os.path.exists(self.log_file):
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for entry in data[-1000:]:  # Последние 1000 записей
-                        self.log_data.append(entry)
+                with open(self.log_file, 'rb') as f:
+                    # Разбираем только последние 1000 строк, остальные отбрасываем без парсинга
+                    lines = deque(f, maxlen=self.log_data.maxlen)
+                skipped = 0
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    # Оборванная запись (прерванная дозапись) не должна отменять загрузку остальных
+                    try:
+                        snapshot = Snapshot.from_dict(_loads(line))
+                    except Exception:
+                        skipped += 1
+                        continue
+                    self.add_snapshot(snapshot)
+                if skipped:
+                    print(f"Пропущено поврежденных записей в логе: {skipped}")
         except Exception as e:
             print(f"Ошибка при загрузке логов: {e}")
     
+    def add_snapshot(self, snapshot):
+        """Добавляет снимок в историю и в кольцевые буферы"""
+        self.log_data.append(snapshot)
+        ts = snapshot.ts_epoch
+        cpu = snapshot.cpu.percent or 0
+        mem = snapshot.memory.percent or 0
+        with self._stats_lock:
+            i = self._i
+            self._ts[i] = ts
+            self._cpu[i] = cpu
+            self._mem[i] = mem
+            self._i = (i + 1) % self._ts.size
+            self._n = min(self._n + 1, self._ts.size)
+            
+            self._seq += 1
+            for window in self._windows.values():
+                window.push(self._seq, ts, cpu, mem)
+    
     def save_log_data(self):
-        """Сохраняет данные логов в файл"""
+        """Перезаписывает файл логов текущими записями (JSON Lines)"""
+        try:
+            with open(self.log_file, 'wb') as f:
+                for entry in self.log_data:
+                    f.write(_dumps(entry.to_dict()) + b'\n')
+        except Exception as e:
+            print(f"Ошибка при сохранении логов: {e}")
+    
+    def append_log_entry(self, entry):
+        """Дописывает одну запись в конец файла логов"""
         try:
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.log_data), f, ensure_ascii=False, indent=2)
+            with open(self.log_file, 'a+b') as f:
+                # Если предыдущая запись оборвана, начинаем новую с новой строки
+                prefix = b''
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        prefix = b'\n'
+                f.write(prefix + _dumps(entry.to_dict()) + b'\n')
         except Exception as e:
             print(f"Ошибка при сохранении логов: {e}")
     
@@ -73,12 +261,12 @@ class SystemMonitor:
     def get_cpu_info(self):
         """Получает информацию о процессоре"""
         try:
-            # Общая загрузка CPU
-            cpu_percent = psutil.cpu_percent(interval=1, percpu=False)
-            
-            # Загрузка по ядрам
+            # Загрузка по ядрам (один замер в 1 сек вместо двух подряд)
             cpu_per_core = psutil.cpu_percent(interval=1, percpu=True)
             
+            # Общая загрузка CPU - среднее по ядрам за тот же интервал
+            cpu_percent = sum(cpu_per_core) / len(cpu_per_core) if cpu_per_core else 0.0
+            
             # Частоты процессора
             cpu_freq = psutil.cpu_freq()
             
@@ -126,11 +314,19 @@ class SystemMonitor:
             print(f"Ошибка при получении информации о памяти: {e}")
             return {}
     
+    def _get_partitions(self):
+        """Возвращает кэшированный список разделов, обновляя его по истечении интервала"""
+        now = time.monotonic()
+        if self._partitions is None or now - self._partitions_time > self.partitions_refresh_interval:
+            self._partitions = psutil.disk_partitions(all=False)
+            self._partitions_time = now
+        return self._partitions
+    
     def get_disk_info(self):
         """Получает информацию о дисках"""
         try:
             disks = []
-            partitions = psutil.disk_partitions()
+            partitions = self._get_partitions()
             
             for partition in partitions:
                 try:
@@ -148,6 +344,10 @@ class SystemMonitor:
                 except PermissionError:
                     # Некоторые разделы могут быть недоступны
                     continue
+                except OSError:
+                    # Раздел из кэша отмонтирован - перечитываем список при следующем снимке
+                    self._partitions = None
+                    continue
             
             # I/O статистика диска
             disk_io = psutil.disk_io_counters()
@@ -221,20 +421,19 @@ class SystemMonitor:
     def get_process_info(self, limit=10):
         """Получает информацию о процессах"""
         try:
-            processes = []
+            # Недоступные атрибуты psutil заменяет на ad_value, исчезнувшие процессы пропускает сам
+            processes = psutil.process_iter(
+                ['pid', 'name', 'cpu_percent', 'memory_percent', 'status'], ad_value=None
+            )
             
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-                try:
-                    processes.append(proc.info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-            
-            # Сортируем по использованию CPU
-            processes.sort(key=lambda x: x['cpu_percent'] or 0, reverse=True)
+            # Берем топ по использованию CPU без полной сортировки всех процессов
+            top_processes = heapq.nlargest(
+                limit, (proc.info for proc in processes), key=lambda x: x['cpu_percent'] or 0
+            )
             
             return {
-                'total_processes': len(processes),
-                'top_processes': processes[:limit]
+                'total_processes': len(psutil.pids()),
+                'top_processes': top_processes
             }
         except Exception as e:
             print(f"Ошибка при получении информации о процессах: {e}")
@@ -242,88 +441,105 @@ class SystemMonitor:
     
     def collect_system_snapshot(self):
         """Собирает полный снимок системы"""
-        timestamp = datetime.now().isoformat()
+        ts_epoch = time.time()
+        timestamp = datetime.fromtimestamp(ts_epoch).isoformat()
+        
+        collectors = (
+            ('cpu', self.get_cpu_info),
+            ('memory', self.get_memory_info),
+            ('disk', self.get_disk_info),
+            ('network', self.get_network_info),
+            ('processes', self.get_process_info)
+        )
+        futures = {key: self._pool.submit(collector) for key, collector in collectors}
         
-        snapshot = {
+        snapshot = Snapshot.from_dict({
             'timestamp': timestamp,
-            'cpu': self.get_cpu_info(),
-            'memory': self.get_memory_info(),
-            'disk': self.get_disk_info(),
-            'network': self.get_network_info(),
-            'processes': self.get_process_info()
-        }
+            'ts_epoch': ts_epoch,
+            **{key: future.result() for key, future in futures.items()}
+        })
         
         return snapshot
     
     def check_thresholds(self, snapshot):
         """Проверяет пороговые значения и создает уведомления"""
         alerts = []
-        timestamp = snapshot['timestamp']
+        timestamp = snapshot.timestamp
+        
+        # Локальные ссылки вместо повторных обращений к словарям
+        thresholds = self.thresholds
+        cpu_threshold = thresholds['cpu_percent']
+        memory_threshold = thresholds['memory_percent']
+        disk_threshold = thresholds['disk_percent']
         
         # Проверка CPU
-        cpu_percent = snapshot['cpu'].get('cpu_percent', 0)
-        if cpu_percent > self.thresholds['cpu_percent']:
-            alerts.append({
-                'timestamp': timestamp,
-                'type': 'cpu_high',
-                'message': f"Высокая загрузка CPU: {cpu_percent:.1f}%",
-                'value': cpu_percent,
-                'threshold': self.thresholds['cpu_percent']
-            })
+        cpu_percent = snapshot.cpu.percent
+        if cpu_percent > cpu_threshold:
+            alerts.append(_make_alert(
+                timestamp, 'cpu_high',
+                f"Высокая загрузка CPU: {cpu_percent:.1f}%",
+                cpu_percent, cpu_threshold
+            ))
         
         # Проверка памяти
-        memory_percent = snapshot['memory'].get('memory_percent', 0)
-        if memory_percent > self.thresholds['memory_percent']:
-            alerts.append({
-                'timestamp': timestamp,
-                'type': 'memory_high',
-                'message': f"Высокое использование памяти: {memory_percent:.1f}%",
-                'value': memory_percent,
-                'threshold': self.thresholds['memory_percent']
-            })
+        memory_percent = snapshot.memory.percent
+        if memory_percent > memory_threshold:
+            alerts.append(_make_alert(
+                timestamp, 'memory_high',
+                f"Высокое использование памяти: {memory_percent:.1f}%",
+                memory_percent, memory_threshold
+            ))
         
         # Проверка дисков
-        for disk in snapshot['disk'].get('disks', []):
-            if disk['percent'] > self.thresholds['disk_percent']:
-                alerts.append({
-                    'timestamp': timestamp,
-                    'type': 'disk_high',
-                    'message': f"Диск {disk['device']} заполнен на {disk['percent']:.1f}%",
-                    'value': disk['percent'],
-                    'threshold': self.thresholds['disk_percent']
-                })
+        for disk in snapshot.disks:
+            disk_percent = disk.percent
+            if disk_percent > disk_threshold:
+                alerts.append(_make_alert(
+                    timestamp, 'disk_high',
+                    f"Диск {disk.device} заполнен на {disk_percent:.1f}%",
+                    disk_percent, disk_threshold
+                ))
         
         return alerts
     
     def start_monitoring(self, interval=60):
         """Запускает мониторинг системы"""
-        def monitor_loop():
-            while self.monitoring:
-                try:
-                    snapshot = self.collect_system_snapshot()
-                    self.log_data.append(snapshot)
-                    
-                    # Проверяем пороговые значения
-                    new_alerts = self.check_thresholds(snapshot)
-                    self.alerts.extend(new_alerts)
-                    
-                    # Ограничиваем количество алертов
-                    if len(self.alerts) > 100:
-                        self.alerts = self.alerts[-100:]
-                    
-                    # Периодически сохраняем данные
-                    if len(self.log_data) % 10 == 0:
-                        self.save_log_data()
-                    
-                    time.sleep(interval)
+        if interval <= 0:
+            raise ValueError(f"Интервал мониторинга должен быть положительным: {interval}")
+        
+        def monitor_loop(stop_event):
+            # Замеры привязаны к сетке monotonic-времени, длительность снимка не копится в интервале
+            deadline = time.monotonic()
+            try:
+                while not stop_event.is_set():
+                    try:
+                        snapshot = self.collect_system_snapshot()
+                        self.add_snapshot(snapshot)
+                        self.append_log_entry(snapshot)
+                        
+                        # Проверяем пороговые значения
+                        new_alerts = self.check_thresholds(snapshot)
+                        self.alerts.extend(new_alerts)
+                        
+                    except Exception as e:
+                        print(f"Ошибка в цикле мониторинга: {e}")
                     
-                except Exception as e:
-                    print(f"Ошибка в цикле мониторинга: {e}")
-                    time.sleep(interval)
+                    deadline += interval
+                    now = time.monotonic()
+                    if deadline < now:
+                        # Снимок занял больше интервала - сразу начинаем следующий и переносим сетку на текущий момент
+                        deadline = now
+                    stop_event.wait(deadline - now)
+            finally:
+                # Поток завершился не через stop_monitoring - снимаем флаг, чтобы мониторинг можно было перезапустить
+                if not stop_event.is_set() and self._stop_event is stop_event:
+                    self.monitoring = False
+                    print("⚠️ Мониторинг неожиданно остановлен")
         
         if not self.monitoring:
             self.monitoring = True
-            self.monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
+            self._stop_event = threading.Event()
+            self.monitor_thread = threading.Thread(target=monitor_loop, args=(self._stop_event,), daemon=True)
             self.monitor_thread.start()
             print(f"✅ Мониторинг запущен (интервал: {interval} сек)")
     
@@ -331,40 +547,59 @@ class SystemMonitor:
         """Останавливает мониторинг"""
         if self.monitoring:
             self.monitoring = False
+            self._stop_event.set()
+            # Даем завершиться текущему снимку, чтобы он не дописался после сжатия лога
+            self.monitor_thread.join(timeout=5)
+            # Сжимаем файл логов до последних записей, чтобы он не рос бесконечно
             self.save_log_data()
             print("⏹️ Мониторинг остановлен")
     
+    def close(self):
+        """Останавливает мониторинг и освобождает потоки сборщиков"""
+        self.stop_monitoring()
+        self._pool.shutdown(wait=False)
+    
     def get_statistics(self, hours=24):
         """Получает статистику за указанный период"""
-        if not self.log_data:
+        if not self._n:
             return None
         
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        recent_data = [
-            entry for entry in self.log_data
-            if datetime.fromisoformat(entry['timestamp']) >= cutoff_time
-        ]
+        now = time.time()
+        window = self._windows.get(hours)
+        if window is not None:
+            with self._stats_lock:
+                window.expire(now)
+                if not len(window):
+                    return None
+                return {
+                    'period_hours': hours,
+                    'data_points': len(window),
+                    'cpu': window.cpu.stats(),
+                    'memory': window.memory.stats()
+                }
         
-        if not recent_data:
+        # Порядок в кольцевом буфере не важен - отбираем записи периода маской
+        cutoff_epoch = now - hours * 3600
+        with self._stats_lock:
+            n = self._n
+            mask = self._ts[:n] >= cutoff_epoch
+            # Булева индексация копирует данные, дальше работаем без блокировки
+            cpu_values = self._cpu[:n][mask]
+            memory_values = self._mem[:n][mask]
+        data_points = int(mask.sum())
+        
+        if not data_points:
             return None
         
-        # Вычисляем средние значения
-        cpu_values = [entry['cpu'].get('cpu_percent', 0) for entry in recent_data if entry['cpu'].get('cpu_percent')]
-        memory_values = [entry['memory'].get('memory_percent', 0) for entry in recent_data if entry['memory'].get('memory_percent')]
+        # Вычисляем средние значения (пропуская отсутствующие и нулевые замеры)
+        cpu_values = cpu_values[cpu_values != 0]
+        memory_values = memory_values[memory_values != 0]
         
         stats = {
             'period_hours': hours,
-            'data_points': len(recent_data),
-            'cpu': {
-                'avg': sum(cpu_values) / len(cpu_values) if cpu_values else 0,
-                'max': max(cpu_values) if cpu_values else 0,
-                'min': min(cpu_values) if cpu_values else 0
-            },
-            'memory': {
-                'avg': sum(memory_values) / len(memory_values) if memory_values else 0,
-                'max': max(memory_values) if memory_values else 0,
-                'min': min(memory_values) if memory_values else 0
-            }
+            'data_points': data_points,
+            'cpu': _aggregate(cpu_values),
+            'memory': _aggregate(memory_values)
         }
         
         return stats
@@ -377,30 +612,29 @@ class SystemMonitor:
         print("=" * 50)
         
         # CPU
-        cpu = snapshot['cpu']
+        cpu = snapshot.cpu
         print(f"\n🔥 ПРОЦЕССОР:")
-        print(f"  📊 Загрузка: {cpu.get('cpu_percent', 0):.1f}%")
-        if cpu.get('cpu_freq_current'):
-            print(f"  ⚡ Частота: {cpu['cpu_freq_current']:.0f} MHz")
+        print(f"  📊 Загрузка: {cpu.percent:.1f}%")
+        if cpu.freq_current:
+            print(f"  ⚡ Частота: {cpu.freq_current:.0f} MHz")
         
         # Память
-        memory = snapshot['memory']
-        memory_total_gb = memory.get('memory_total', 0) / (1024**3)
-        memory_used_gb = memory.get('memory_used', 0) / (1024**3)
+        memory = snapshot.memory
+        memory_total_gb = memory.total / (1024**3)
+        memory_used_gb = memory.used / (1024**3)
         print(f"\n💾 ПАМЯТЬ:")
-        print(f"  📊 Использовано: {memory.get('memory_percent', 0):.1f}%")
+        print(f"  📊 Использовано: {memory.percent:.1f}%")
         print(f"  💽 Объем: {memory_used_gb:.1f} GB / {memory_total_gb:.1f} GB")
         
         # Диски
-        disk = snapshot['disk']
         print(f"\n💿 ДИСКИ:")
-        for disk_info in disk.get('disks', []):
-            total_gb = disk_info['total'] / (1024**3)
-            used_gb = disk_info['used'] / (1024**3)
-            print(f"  {disk_info['device']}: {disk_info['percent']:.1f}% ({used_gb:.1f}/{total_gb:.1f} GB)")
+        for disk_info in snapshot.disks:
+            total_gb = disk_info.total / (1024**3)
+            used_gb = disk_info.used / (1024**3)
+            print(f"  {disk_info.device}: {disk_info.percent:.1f}% ({used_gb:.1f}/{total_gb:.1f} GB)")
         
         # Топ процессов
-        processes = snapshot['processes']
+        processes = snapshot.processes
         print(f"\n⚙️  ТОП ПРОЦЕССОВ по CPU:")
         for proc in processes.get('top_processes', [])[:5]:
             print(f"  {proc['name'][:20]:20} {proc['cpu_percent'] or 0:6.1f}% CPU {proc['memory_percent'] or 0:6.1f}% RAM")
@@ -464,7 +698,7 @@ def main():
             print("=" * 50)
             
             if monitor.alerts:
-                for alert in monitor.alerts[-20:]:  # Последние 20
+                for alert in list(monitor.alerts)[-20:]:  # Последние 20
                     timestamp = datetime.fromisoformat(alert['timestamp']).strftime('%H:%M:%S')
                     print(f"[{timestamp}] {alert['message']}")
             else:
@@ -522,7 +756,7 @@ def main():
                 print("❌ Введите корректное числовое значение")
                 
         elif choice == "8":
-            monitor.stop_monitoring()
+            monitor.close()
             print("До свидания! 🖥️")
             break
             